@@ -14,14 +14,15 @@ Features:
 """
 
 import os
+import re
 import sys
 import json
 import time
+import base64
 import hashlib
 import secrets
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
-import requests
 from dateutil.parser import parse as parse_date
 from dateutil.relativedelta import relativedelta
 
@@ -30,9 +31,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 try:
     from fastapi import FastAPI, Request
-    from fastapi.middleware.cors import CORSMiddleware
     from starlette.applications import Starlette
-    from starlette.routing import Mount
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.responses import JSONResponse
+    from starlette.routing import Mount, Route
     from mcp import FastMCP
     import uvicorn
     FASTAPI_AVAILABLE = True
@@ -48,6 +51,22 @@ if not FASTAPI_AVAILABLE:
 SHUTTER_API_BASE = "https://shutter-api.chiado.staging.shutter.network/api"
 SHUTTER_REGISTRY_ADDRESS = "0x2693a4Fb363AdD4356e6b80Ac5A27fF05FeA6D9F"
 
+# Relative time expressions such as "3 months" (after "from now" is removed)
+_REL_RE = re.compile(r"^(\d+)\s*(minute|hour|day|week|month|year)s?\b")
+_UNIT = {
+    "minute": lambda n: timedelta(minutes=n),
+    "hour": lambda n: timedelta(hours=n),
+    "day": lambda n: timedelta(days=n),
+    "week": lambda n: timedelta(weeks=n),
+    "month": lambda n: relativedelta(months=n),
+    "year": lambda n: relativedelta(years=n),
+}
+
+def _requests():
+    """Import requests on first use; the non-network tools never need it."""
+    import requests
+    return requests
+
 class ShutterTimelock:
     """Handles Shutter API interactions for timelock encryption"""
     
@@ -65,24 +84,9 @@ class ShutterTimelock:
             time_expr = time_expr.replace("from now", "").strip()
             
         # Parse different time formats
-        if "minute" in time_expr:
-            minutes = int(''.join(filter(str.isdigit, time_expr)))
-            target_time = now + timedelta(minutes=minutes)
-        elif "hour" in time_expr:
-            hours = int(''.join(filter(str.isdigit, time_expr)))
-            target_time = now + timedelta(hours=hours)
-        elif "day" in time_expr:
-            days = int(''.join(filter(str.isdigit, time_expr)))
-            target_time = now + timedelta(days=days)
-        elif "week" in time_expr:
-            weeks = int(''.join(filter(str.isdigit, time_expr)))
-            target_time = now + timedelta(weeks=weeks)
-        elif "month" in time_expr:
-            months = int(''.join(filter(str.isdigit, time_expr)))
-            target_time = now + relativedelta(months=months)
-        elif "year" in time_expr:
-            years = int(''.join(filter(str.isdigit, time_expr)))
-            target_time = now + relativedelta(years=years)
+        match = _REL_RE.match(time_expr)
+        if match:
+            target_time = now + _UNIT[match.group(2)](int(match.group(1)))
         else:
             # Try to parse as absolute date
             try:
@@ -107,7 +111,7 @@ class ShutterTimelock:
             "identityPrefix": identity_prefix
         }
         
-        response = requests.post(url, json=payload)
+        response = _requests().post(url, json=payload)
         response.raise_for_status()
         return response.json()
     
@@ -116,7 +120,7 @@ class ShutterTimelock:
         url = f"{self.api_base}/get_data_for_encryption"
         params = {"address": self.registry_address}
         
-        response = requests.get(url, params=params)
+        response = _requests().get(url, params=params)
         response.raise_for_status()
         return response.json()
     
@@ -125,6 +129,7 @@ class ShutterTimelock:
         url = f"{self.api_base}/get_decryption_key"
         params = {"identity": identity}
         
+        requests = _requests()
         try:
             response = requests.get(url, params=params)
             response.raise_for_status()
@@ -149,7 +154,6 @@ class ShutterTimelock:
         }
         
         # Encode as base64 for transport
-        import base64
         json_str = json.dumps(encrypted_data)
         encoded = base64.b64encode(json_str.encode()).decode()
         return f"SHUTTER_ENCRYPTED:{encoded}"
@@ -292,7 +296,6 @@ if FASTAPI_AVAILABLE:
             
             # Decrypt the message (simplified implementation)
             if encrypted_data.startswith("SHUTTER_ENCRYPTED:"):
-                import base64
                 encoded_data = encrypted_data.replace("SHUTTER_ENCRYPTED:", "")
                 json_str = base64.b64decode(encoded_data).decode()
                 data = json.loads(json_str)
@@ -367,29 +370,7 @@ if FASTAPI_AVAILABLE:
         
         return json.dumps(explanation, indent=2)
     
-    # Create the FastAPI app with MCP
-    app = Starlette(
-        routes=[
-            Mount("/sse", app=mcp.sse_app()),
-        ]
-    )
-    
-    # Add CORS middleware
-    from starlette.middleware import Middleware
-    from starlette.middleware.cors import CORSMiddleware
-    
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
-    
     # Add a simple info endpoint
-    from starlette.responses import JSONResponse
-    from starlette.routing import Route
-    
     async def info_endpoint(request):
         return JSONResponse({
             "name": "Shutter Timelock Encryption MCP Server",
@@ -408,7 +389,23 @@ if FASTAPI_AVAILABLE:
             "usage": "Add this server to Claude web integrations using the /sse endpoint"
         })
     
-    app.routes.insert(0, Route("/", info_endpoint))
+    # Create the Starlette app with MCP. CORS is configured up front so the
+    # middleware stack is built once; wildcard origins without credentials
+    # take Starlette's allow-all fast path instead of echoing each origin.
+    app = Starlette(
+        routes=[
+            Route("/", info_endpoint),
+            Mount("/sse", app=mcp.sse_app()),
+        ],
+        middleware=[
+            Middleware(
+                CORSMiddleware,
+                allow_origins=["*"],
+                allow_methods=["GET", "POST", "OPTIONS"],
+                allow_headers=["Content-Type", "Accept", "Authorization", "Last-Event-ID"],
+            )
+        ]
+    )
 
 else:
     # Flask fallback implementation
@@ -432,7 +429,18 @@ else:
 
 if __name__ == "__main__":
     if FASTAPI_AVAILABLE:
-        uvicorn.run(app, host="0.0.0.0", port=5001, log_level="info")
+        # Multiple workers need an import string rather than the app object
+        uvicorn.run(
+            "src.main:app",
+            host="0.0.0.0",
+            port=5001,
+            loop="uvloop",
+            http="httptools",
+            workers=int(os.getenv("WEB_CONCURRENCY", max(2, os.cpu_count() or 1))),
+            timeout_keep_alive=75,
+            log_level="warning",
+            access_log=False
+        )
     else:
         app.run(host="0.0.0.0", port=5001, debug=True)
 
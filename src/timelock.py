@@ -0,0 +1,349 @@
+"""
+Shutter API client and time parsing for timelock encryption.
+
+This module has no MCP or web framework dependencies, which keeps it small
+enough to compile with mypyc (``mypyc src/timelock.py``). When a compiled
+extension is present Python imports it in preference to this file; otherwise
+this pure Python version is used unchanged.
+"""
+
+import asyncio
+import base64
+import datetime
+import functools
+import hashlib
+import re
+import secrets
+import time
+from typing import Optional, Tuple, Union
+import httpx
+import orjson
+from cachetools import LRUCache, TTLCache
+from dateutil.parser import parse as parse_date
+from dateutil.relativedelta import relativedelta
+
+try:
+    # Optional C parser for ISO 8601 dates; dateutil handles everything else
+    import ciso8601
+except ImportError:
+    ciso8601 = None  # type: ignore[assignment]
+
+# Shutter API configuration
+SHUTTER_API_BASE = "https://shutter-api.chiado.staging.shutter.network/api"
+SHUTTER_REGISTRY_ADDRESS = "0x2693a4Fb363AdD4356e6b80Ac5A27fF05FeA6D9F"
+API_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+EON_CACHE_TTL = 60.0  # seconds; the eon key rotates on a much slower schedule
+NOT_READY_BACKOFF = (2.0, 30.0)  # (initial, max) seconds between key polls
+KEY_CACHE_SIZE = 512  # released decryption keys kept in memory
+ENVELOPE_CACHE_SIZE = 64  # recently decoded envelopes (status check, then decrypt)
+ENCRYPTED_PREFIX = "SHUTTER_ENCRYPTED:"
+_ENCRYPTED_PREFIX_BYTES = ENCRYPTED_PREFIX.encode()
+_UTC = datetime.timezone.utc
+
+# Accepted range for raw Unix timestamps
+MIN_UNIX_TIMESTAMP = 1704067200  # Jan 1, 2024
+MAX_UNIX_TIMESTAMP = 4102444800  # Jan 1, 2100; larger values are likely milliseconds
+
+# Relative time expressions such as "3 months from now" or "1 hour"
+_REL_RE = re.compile(r"^\s*(\d+)\s*(minute|hour|day|week|month|year)s?\b", re.I)
+_UNIT = {
+    "minute": lambda n: datetime.timedelta(minutes=n),
+    "hour": lambda n: datetime.timedelta(hours=n),
+    "day": lambda n: datetime.timedelta(days=n),
+    "week": lambda n: datetime.timedelta(weeks=n),
+    "month": lambda n: relativedelta(months=n),
+    "year": lambda n: relativedelta(years=n),
+}
+
+@functools.lru_cache(maxsize=512)
+def _rel_delta(n: int, unit: str) -> Union[datetime.timedelta, relativedelta]:
+    """
+    Build (and memoize) the timedelta/relativedelta for "<n> <unit>".
+    
+    Both types are immutable, so cached instances can be shared between calls.
+    """
+    return _UNIT[unit](n)
+
+@functools.lru_cache(maxsize=1024)
+def _parse_absolute(time_expr: str, today: datetime.date) -> datetime.datetime:
+    """
+    Memoized parse for absolute dates.
+    
+    ISO 8601 strings go through ciso8601 when it is installed. dateutil fills
+    missing fields (e.g. the year in "December 25") from today's date, so today
+    is part of the cache key. Dates without an explicit timezone are
+    interpreted as UTC.
+    """
+    if ciso8601 is not None:
+        try:
+            parsed = ciso8601.parse_datetime(time_expr)
+        except ValueError:
+            pass
+        else:
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=_UTC)
+    
+    return parse_date(time_expr, default=datetime.datetime.combine(today, datetime.time(), tzinfo=_UTC))
+
+@functools.lru_cache(maxsize=ENVELOPE_CACHE_SIZE)
+def _decode_envelope(encrypted_data: str) -> str:
+    """Memoized decode of a SHUTTER_ENCRYPTED envelope to its message."""
+    return orjson.loads(base64.b64decode(encrypted_data[len(ENCRYPTED_PREFIX):]))["message"]
+
+class ShutterTimelock:
+    """
+    Handles Shutter API interactions for timelock encryption.
+    
+    The Shutter Network provides trustless timelock encryption using threshold
+    cryptography and a decentralized network of keypers.
+    """
+    
+    def __init__(self) -> None:
+        self.api_base = SHUTTER_API_BASE
+        self.registry_address = SHUTTER_REGISTRY_ADDRESS
+        
+        # One shared async client: keep-alive + HTTP/2 lets concurrent tool
+        # calls multiplex onto a single connection to the Shutter API
+        self.client = httpx.AsyncClient(
+            base_url=self.api_base,
+            timeout=API_TIMEOUT,
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+                retries=3  # connection-level retries
+            )
+        )
+        
+        # (fetched_at, data) for get_encryption_data, refreshed single-flight
+        self._eon_cache: Optional[Tuple[float, dict]] = None
+        self._eon_ttl = EON_CACHE_TTL
+        self._eon_lock = asyncio.Lock()
+        
+        # identity -> (retry_at, backoff) for keys the API reported as not yet
+        # released, so tight polling loops don't hit the network every time
+        self._not_ready = TTLCache(maxsize=10_000, ttl=NOT_READY_BACKOFF[1])
+        
+        # identity -> released decryption key; keys never change once released
+        self._keys = LRUCache(maxsize=KEY_CACHE_SIZE)
+        
+    def parse_time_expression(self, time_expr: str) -> int:
+        """
+        Parse natural language time expressions OR Unix timestamps to Unix timestamp.
+        
+        Args:
+            time_expr: Time expression to parse. Can be:
+                      - Unix timestamp (e.g., "1721905313")
+                      - Natural language (e.g., "3 months from now")
+                      - Absolute date (e.g., "2024-12-25")
+        
+        Returns:
+            Unix timestamp as integer
+            
+        Raises:
+            ValueError: If time expression cannot be parsed
+        """
+        if not isinstance(time_expr, str):
+            time_expr = str(time_expr)
+        # str.strip() returns the same object when there is nothing to strip
+        time_expr = time_expr.strip()
+        
+        # Check if it's already a Unix timestamp (numeric string)
+        try:
+            timestamp = int(time_expr)
+        except ValueError:
+            pass
+        else:
+            # Validate it's a reasonable future timestamp (2024-2100)
+            if timestamp <= MIN_UNIX_TIMESTAMP:
+                raise ValueError(f"Unix timestamp {timestamp} appears to be in the past or invalid")
+            if timestamp >= MAX_UNIX_TIMESTAMP:
+                raise ValueError(
+                    f"Unix timestamp {timestamp} is too far in the future - "
+                    "use seconds, not milliseconds"
+                )
+            return timestamp
+        
+        # Handle relative expressions like "3 months from now"
+        match = _REL_RE.match(time_expr)
+        if match:
+            now = datetime.datetime.now(_UTC)
+            delta = _rel_delta(int(match.group(1)), match.group(2).lower())
+            return int((now + delta).timestamp())
+        
+        # Try to parse as absolute date
+        try:
+            target_time = _parse_absolute(time_expr, datetime.datetime.now(_UTC).date())
+        except:
+            raise ValueError(
+                f"Could not parse time expression: {time_expr}. "
+                "Use Unix timestamp, natural language like '3 months from now', "
+                "or date like '2024-12-25'"
+            )
+        
+        return int(target_time.timestamp())
+    
+    def generate_identity_prefix(self, message: str, timestamp: int) -> str:
+        """
+        Generate a unique identity prefix for the encryption.
+        
+        Args:
+            message: The message to encrypt
+            timestamp: Unix timestamp for unlock time
+            
+        Returns:
+            Hex-encoded identity prefix
+        """
+        # The prefix only needs to be unique, not a SHA-256 commitment, so use
+        # the faster BLAKE2b with a 32-byte digest (the size the API expects)
+        hash_obj = hashlib.blake2b(message.encode(), digest_size=32)
+        hash_obj.update(b"_")
+        hash_obj.update(timestamp.to_bytes(8, "big"))
+        hash_obj.update(b"_")
+        hash_obj.update(secrets.token_bytes(16))
+        return "0x" + hash_obj.hexdigest()
+    
+    async def register_identity(self, timestamp: int, identity_prefix: str) -> dict:
+        """
+        Register identity with Shutter API for timelock decryption.
+        
+        Args:
+            timestamp: Unix timestamp for unlock time
+            identity_prefix: Unique identity prefix
+            
+        Returns:
+            Registration response from Shutter API
+            
+        Raises:
+            httpx.HTTPError: If API call fails
+        """
+        payload = {
+            "decryptionTimestamp": timestamp,
+            "identityPrefix": identity_prefix
+        }
+        
+        response = await self.client.post("/register_identity", json=payload)
+        response.raise_for_status()
+        return response.json()
+    
+    async def get_encryption_data(self) -> dict:
+        """
+        Get encryption data from Shutter API.
+        
+        The response is cached for EON_CACHE_TTL seconds; concurrent callers
+        share a single refresh when it expires.
+        
+        Returns:
+            Encryption data from Shutter API
+            
+        Raises:
+            httpx.HTTPError: If API call fails
+        """
+        cached = self._eon_cache
+        if cached and time.monotonic() - cached[0] < self._eon_ttl:
+            return cached[1]
+        
+        async with self._eon_lock:
+            # Another coroutine may have refreshed while we waited
+            cached = self._eon_cache
+            if cached and time.monotonic() - cached[0] < self._eon_ttl:
+                return cached[1]
+            
+            params = {"address": self.registry_address}
+            
+            response = await self.client.get("/get_data_for_encryption", params=params)
+            response.raise_for_status()
+            data = response.json()
+            self._eon_cache = (time.monotonic(), data)
+            return data
+    
+    async def get_decryption_key(self, identity: str) -> Optional[dict]:
+        """
+        Get decryption key if timelock has expired.
+        
+        Released keys are immutable and cached, so checking the status and
+        then decrypting costs a single request. After a 404 the identity is
+        not re-queried until an exponentially growing backoff
+        (NOT_READY_BACKOFF) has passed; polls in between return None without
+        a request.
+        
+        Args:
+            identity: Identity returned from registration
+            
+        Returns:
+            Decryption key data or None if not yet available
+            
+        Raises:
+            httpx.HTTPError: If API call fails (except 404)
+        """
+        key = self._keys.get(identity)
+        if key is not None:
+            return key
+        
+        not_ready = self._not_ready.get(identity)
+        if not_ready and time.monotonic() < not_ready[0]:
+            return None
+        
+        params = {"identity": identity}
+        
+        try:
+            response = await self.client.get("/get_decryption_key", params=params)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                # Key not yet available
+                initial, maximum = NOT_READY_BACKOFF
+                backoff = min(maximum, not_ready[1] * 2) if not_ready else initial
+                self._not_ready[identity] = (time.monotonic() + backoff, backoff)
+                return None
+            raise
+        
+        self._not_ready.pop(identity, None)
+        key = response.json()
+        self._keys[identity] = key
+        return key
+    
+    def encrypt_message_simple(self, message: str, identity: str, eon_key: str) -> str:
+        """
+        Simple encryption placeholder (demo implementation).
+        
+        Note: This is a demo implementation. In production, you would use
+        the actual Shutter encryption algorithm with the provided eon_key.
+        
+        Args:
+            message: Message to encrypt
+            identity: Identity for decryption
+            eon_key: Encryption key from Shutter API
+            
+        Returns:
+            Base64-encoded encrypted data
+        """
+        encrypted_data = {
+            "message": message,
+            "identity": identity,
+            "eon_key": eon_key,
+            "encrypted": True,
+            "note": "Demo implementation using Shutter Network timelock encryption"
+        }
+        
+        encoded = base64.b64encode(orjson.dumps(encrypted_data))
+        return (_ENCRYPTED_PREFIX_BYTES + encoded).decode("ascii")
+    
+    def decrypt_message_simple(self, encrypted_data: str) -> str:
+        """
+        Decode data produced by encrypt_message_simple (demo implementation).
+        
+        Args:
+            encrypted_data: Envelope starting with ENCRYPTED_PREFIX
+            
+        Returns:
+            The original message
+            
+        Raises:
+            ValueError: If the data is not a valid envelope
+        """
+        if not encrypted_data.startswith(ENCRYPTED_PREFIX):
+            raise ValueError("Invalid encrypted data format")
+        return _decode_envelope(encrypted_data)
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client and its connections."""
+        await self.client.aclose()
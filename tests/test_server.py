@@ -9,14 +9,16 @@ import pytest
 import asyncio
 import json
 from datetime import datetime, timedelta
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 import sys
 import os
+import httpx
+import base64
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from server import ShutterTimelock, mcp
+from server import ShutterTimelock, mcp, timelock
 
 class TestShutterTimelock:
     """Test the ShutterTimelock class functionality."""
@@ -35,6 +37,10 @@ class TestShutterTimelock:
         # Invalid past timestamp
         with pytest.raises(ValueError):
             self.timelock.parse_time_expression("1000000000")  # Year 2001
+        
+        # Millisecond timestamps are rejected rather than read as seconds
+        with pytest.raises(ValueError):
+            self.timelock.parse_time_expression(str(future_timestamp * 1000))
     
     def test_parse_natural_language(self):
         """Test parsing of natural language time expressions."""
@@ -46,6 +52,8 @@ class TestShutterTimelock:
             ("2 hours from now", timedelta(hours=2)),
             ("3 days from now", timedelta(days=3)),
             ("1 week from now", timedelta(weeks=1)),
+            ("10 Minutes From Now", timedelta(minutes=10)),
+            ("12hours", timedelta(hours=12)),
         ]
         
         for expr, expected_delta in test_cases:
@@ -78,6 +86,71 @@ class TestShutterTimelock:
         assert prefix1 != prefix2
         assert prefix1.startswith("0x")
         assert len(prefix1) == 66  # 0x + 64 hex chars
+    
+    def test_encrypt_message_simple(self):
+        """Test the encrypted envelope format."""
+        encrypted = self.timelock.encrypt_message_simple("héllo", "0xid", "0xkey")
+        
+        assert encrypted.startswith("SHUTTER_ENCRYPTED:")
+        data = json.loads(base64.b64decode(encrypted[len("SHUTTER_ENCRYPTED:"):]))
+        assert data["message"] == "héllo"
+        assert data["identity"] == "0xid"
+        assert data["eon_key"] == "0xkey"
+        
+        assert self.timelock.decrypt_message_simple(encrypted) == "héllo"
+        with pytest.raises(ValueError):
+            self.timelock.decrypt_message_simple("not encrypted")
+    
+    @pytest.mark.asyncio
+    async def test_encryption_data_is_cached(self):
+        """Test that the eon key data is reused within the TTL."""
+        response = Mock()
+        response.json.return_value = {"message": {"eon_key": "0xdeadbeef"}}
+        
+        with patch.object(self.timelock.client, 'get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = response
+            first = await self.timelock.get_encryption_data()
+            second = await self.timelock.get_encryption_data()
+        
+        assert first == second
+        assert mock_get.call_count == 1
+        
+        # Expired entries are refetched
+        self.timelock._eon_ttl = 0
+        with patch.object(self.timelock.client, 'get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = response
+            await self.timelock.get_encryption_data()
+        
+        assert mock_get.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_decryption_key_not_ready_is_backed_off(self):
+        """Test that polls right after a 404 skip the network."""
+        response = Mock()
+        response.raise_for_status.side_effect = httpx.HTTPStatusError(
+            "not found", request=Mock(), response=Mock(status_code=404)
+        )
+        
+        with patch.object(self.timelock.client, 'get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = response
+            assert await self.timelock.get_decryption_key("0xabc") is None
+            assert await self.timelock.get_decryption_key("0xabc") is None
+        
+        assert mock_get.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_released_decryption_key_is_cached(self):
+        """Test that a released key is only fetched once."""
+        response = Mock()
+        response.json.return_value = {"message": {"decryption_key": "0xkey"}}
+        
+        with patch.object(self.timelock.client, 'get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = response
+            first = await self.timelock.get_decryption_key("0xabc")
+            second = await self.timelock.get_decryption_key("0xabc")
+        
+        assert first == second == {"message": {"decryption_key": "0xkey"}}
+        assert mock_get.call_count == 1
 
 class TestMCPTools:
     """Test MCP tool functions."""
@@ -128,12 +201,13 @@ class TestMCPTools:
 class TestIntegration:
     """Integration tests for the full server."""
     
-    @patch('requests.post')
-    @patch('requests.get')
+    @patch.object(timelock.client, 'post', new_callable=AsyncMock)
+    @patch.object(timelock.client, 'get', new_callable=AsyncMock)
     @pytest.mark.asyncio
     async def test_timelock_encrypt_flow(self, mock_get, mock_post):
         """Test the complete timelock encryption flow."""
         # Mock Shutter API responses
+        mock_post.return_value = Mock()
         mock_post.return_value.json.return_value = {
             "message": {
                 "identity": "0x1234567890abcdef",
@@ -143,6 +217,7 @@ class TestIntegration:
         }
         mock_post.return_value.raise_for_status.return_value = None
         
+        mock_get.return_value = Mock()
         mock_get.return_value.json.return_value = {
             "message": {
                 "eon_key": "0xdeadbeef"